@@ -1,36 +1,137 @@
 import argparse
 import asyncio
 import calendar
-import json
+import hashlib
+import html
+import random
 import re
 import sys
+import time
+from contextlib import asynccontextmanager, nullcontext
 from datetime import datetime
+from enum import Enum
+from functools import cached_property, lru_cache, partial
 from io import BytesIO
+from pathlib import Path
 from typing import Optional, Dict, Any
+from urllib.parse import urlsplit
 
 import aiohttp
+import numpy as np
+import orjson
 import qrcode
+from aiolimiter import AsyncLimiter
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps, ImageEnhance
 
 from ttml.ttml import TTML
 
 TTML_DB_URL_PREFIX = "https://amlldb.bikonoo.com"
+# 封面磁盘缓存的默认目录 (缓存默认关闭，通过 cover_cache_dir / --cover-cache 开启)
+DEFAULT_COVER_CACHE_DIR = Path.home() / ".cache" / "music-rec-card"
+
+# CJK 统一表意文字 U+4E00..U+9FFF 与 CJK 兼容表意文字 U+F900..U+FAFF
+CJK_PATTERN = re.compile(r'[\u4e00-\u9fff\uf900-\ufaff]')
+# 引言行首的对齐/格式标记，如 [:-:]、[_:]、[-]
+QUOTE_SPEC_PATTERN = re.compile(r'^\[([:_-]+)\](.*)')
+# QQ 音乐网页内嵌的初始数据 (JS 对象字面量)
+QQ_INITIAL_DATA_PATTERN = re.compile(rb'window\.__INITIAL_DATA__ =(.*?)</script>', re.S)
+# JS 双引号字符串字面量 (展开循环写法，整段匹配，带捕获组供 split 保留)
+JS_STRING_PATTERN = re.compile(rb'("[^"\\]*(?:\\.[^"\\]*)*")')
+# 字符串之外的裸 undefined
+JS_UNDEFINED_PATTERN = re.compile(rb'\bundefined\b')
+
+
+def _js_undefined_to_null(blob: bytes) -> bytes:
+    """
+    把 JS 对象字面量中字符串之外的 undefined 替换为 null，字符串内容保持不变。
+    按字符串字面量切分后，把字符串之外的片段以 NUL 连接 (合法 JSON 的字符串之外不会出现 NUL)，
+    一次性替换再切回，全程无逐个匹配的 Python 回调。
+    """
+    if b'undefined' not in blob:
+        return blob
+    parts = JS_STRING_PATTERN.split(blob)
+    parts[0::2] = JS_UNDEFINED_PATTERN.sub(b'null', b'\x00'.join(parts[0::2])).split(b'\x00')
+    return b''.join(parts)
 
 
-class MusicCard:
+@lru_cache(maxsize=64)
+def _load_font(path: str, size: int, index: int) -> ImageFont.FreeTypeFont:
+    """加载字体 (按路径、字号、字重缓存，跨多次生成复用)"""
+    return ImageFont.truetype(path, size, index=index)
+
+
+@lru_cache(maxsize=8192)
+def _char_width(font: ImageFont.FreeTypeFont, char: str) -> float:
+    """单个字符的步进宽度 (按字体缓存)"""
+    return font.getlength(char)
+
+
+@lru_cache(maxsize=1024)
+def _text_width(font: ImageFont.FreeTypeFont, text: str) -> float:
+    """整行文本的排版宽度 (按字体缓存，用于对齐计算)"""
+    return font.getlength(text)
+
+
+@lru_cache(maxsize=64)
+def _line_height(font: ImageFont.FreeTypeFont, sample: str = "高") -> int:
+    """字体的基础行高 (默认以 "高" 字的包围盒计算)"""
+    bbox = font.getbbox(sample)
+    return bbox[3] - bbox[1]
+
+
+class CardMode(str, Enum):
+    """制卡模式 (继承 str，可直接与命令行传入的字符串比较)"""
     DAILY = "daily"
     CARD = "card"
     LYRIC = "lyric"
+
+
+class MusicCard:
+    DAILY = CardMode.DAILY
+    CARD = CardMode.CARD
+    LYRIC = CardMode.LYRIC
     Regular = 2
     Medium = 5
     Semibold = 8
     Light = 11
     Thin = 14
     Ultralight = 17
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
+    REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5)
+    IMAGE_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=5)
+    # 被限流 / 服务暂不可用时的重试 (指数退避)
+    RETRY_STATUSES = frozenset({429, 502, 503})
+    MAX_RETRIES = 3
+    RETRY_BACKOFF = 0.5
+    # 封面磁盘缓存的有效期 (秒) 与总容量上限 (字节)，超出后按修改时间从旧到新清理
+    COVER_CACHE_TTL = 7 * 24 * 3600
+    COVER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+    # 各 API 主机的请求速率上限 (次/秒)，批量生成时避免触发 429
+    _RATE_LIMITS = {
+        "music.163.com": AsyncLimiter(5, 1),
+        "y.qq.com": AsyncLimiter(3, 1),
+        "amlldb.bikonoo.com": AsyncLimiter(10, 1),
+    }
 
-    def __init__(self, font_path: str, platform: str = "ncm"):
+    # 跨实例共享的连接池，避免对同一主机重复 TLS 握手
+    _connector: Optional[aiohttp.TCPConnector] = None
+    _connector_loop: Optional[asyncio.AbstractEventLoop] = None
+    # 图片下载被拒时使用的 curl_cffi 会话 (模拟浏览器 TLS 指纹)，同样跨实例共享
+    _curl_session = None
+    _curl_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __init__(self, font_path: Optional[str] = None, platform: str = "ncm",
+                 cover_cache_dir: str | Path | None = None):
+        # 字体仅在制图时加载；只获取数据 (如歌词) 时可以不提供
         self.font_path = font_path
         self.platform = platform
+        # 封面磁盘缓存目录，None 表示不缓存
+        self.cover_cache_dir: Optional[Path] = Path(cover_cache_dir) if cover_cache_dir else None
+
+        # 网络会话 (懒加载，所有请求共享)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(8)
 
         # 布局常量
         self.W = 1000
@@ -53,94 +154,233 @@ class MusicCard:
     # --- 数据获取 ---
 
     @staticmethod
-    async def download_image(url: str) -> Image.Image:
-        """[异步] 下载图片"""
+    async def _close_stale(close, owner: asyncio.AbstractEventLoop) -> None:
+        """
+        [异步] 关闭上一个事件循环遗留的共享资源 (close 为返回协程的函数)。
+        所属循环仍在 (其它线程中) 运行时交回该循环执行，否则直接在当前循环执行；失败时只记录，不影响新资源。
+        """
+        try:
+            if owner.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(close(), owner))
+            else:
+                await close()
+        except Exception as e:
+            print(f"关闭旧事件循环的连接失败: {e}")
+
+    @classmethod
+    async def _get_connector(cls) -> aiohttp.TCPConnector:
+        """[异步] 获取所有 MusicCard 实例共享的连接池 (按事件循环懒加载，切换事件循环时先关闭旧连接池)"""
+        loop = asyncio.get_running_loop()
+        if cls._connector is None or cls._connector.closed or cls._connector_loop is not loop:
+            stale, stale_loop = cls._connector, cls._connector_loop
+            # 先替换再关闭，关闭期间并发进入的请求直接拿到新连接池
+            cls._connector = aiohttp.TCPConnector(limit=32, limit_per_host=16, ttl_dns_cache=600,
+                                                  keepalive_timeout=30, enable_cleanup_closed=True)
+            cls._connector_loop = loop
+            if stale is not None and not stale.closed:
+                async def close_stale():
+                    await stale.close()
+
+                await cls._close_stale(close_stale, stale_loop)
+        return cls._connector
+
+    @classmethod
+    async def aclose_connector(cls) -> None:
+        """[异步] 关闭共享连接池 (进程退出前调用)"""
+        if cls._connector is not None and not cls._connector.closed:
+            await cls._connector.close()
+        cls._connector = None
+        cls._connector_loop = None
+        if cls._curl_session is not None:
+            await cls._curl_session.close()
+        cls._curl_session = None
+        cls._curl_session_loop = None
+
+    @classmethod
+    async def _get_curl_session(cls):
+        """[异步] 获取共享的 curl_cffi 异步会话 (按事件循环懒加载，切换事件循环时先关闭旧会话；仅在回退时才导入 curl_cffi)"""
+        from curl_cffi.requests import AsyncSession
+
+        loop = asyncio.get_running_loop()
+        if cls._curl_session is None or cls._curl_session_loop is not loop:
+            stale, stale_loop = cls._curl_session, cls._curl_session_loop
+            cls._curl_session = AsyncSession(impersonate="chrome110", timeout=10)
+            cls._curl_session_loop = loop
+            if stale is not None:
+                await cls._close_stale(stale.close, stale_loop)
+        return cls._curl_session
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """[异步] 获取共享的 HTTP 会话 (懒加载，复用连接与 TLS 握手)"""
+        connector = await self._get_connector()
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers={"User-Agent": self.USER_AGENT},
+                                                  connector=connector, connector_owner=False,
+                                                  timeout=self.REQUEST_TIMEOUT, trust_env=True)
+        return self._session
+
+    async def aclose(self) -> None:
+        """[异步] 关闭本实例的 HTTP 会话 (共享连接池保持打开)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "MusicCard":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    @classmethod
+    def _throttle(cls, url: str):
+        """获取 URL 所属主机的限速器，未配置的主机不限速"""
+        limiter = cls._RATE_LIMITS.get(urlsplit(url).hostname)
+        return limiter if limiter is not None else nullcontext()
+
+    @asynccontextmanager
+    async def _get(self, url: str, **kwargs):
+        """
+        [异步] 限流的 GET 请求。
+        遇到 429/502/503 时释放连接与并发名额，按 RETRY_BACKOFF·2^n (+抖动) 退避后重试，
+        最多 MAX_RETRIES 次；最终响应原样交给调用方判断状态码。
+        """
+        session = await self._get_session()
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                async with self._throttle(url), session.get(url, **kwargs) as resp:
+                    if resp.status not in self.RETRY_STATUSES or attempt >= self.MAX_RETRIES:
+                        yield resp
+                        return
+            delay = self.RETRY_BACKOFF * 2 ** attempt * (1 + random.random() * 0.5)
+            attempt += 1
+            print(f"请求受限 ({resp.status})，{delay:.1f}s 后第 {attempt} 次重试: {url}")
+            await asyncio.sleep(delay)
+
+    def _cover_cache_path(self, url: str) -> Path:
+        return self.cover_cache_dir / hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _load_cached_cover(self, url: str) -> Optional[Image.Image]:
+        """读取并解码磁盘缓存的封面 (在线程中执行)；未命中、过期或损坏返回 None，后两者同时删除缓存文件"""
+        path = self._cover_cache_path(url)
+        try:
+            if time.time() - path.stat().st_mtime > self.COVER_CACHE_TTL:
+                path.unlink(missing_ok=True)
+                return None
+            image = Image.open(BytesIO(path.read_bytes()))
+            # Image.open 只读取文件头，截断的文件要到 load 时才会报错
+            image.load()
+            return image
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"封面缓存损坏: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _store_cached_cover(self, url: str, content: bytes) -> None:
+        """写入封面磁盘缓存并把总容量控制在 COVER_CACHE_MAX_BYTES 以内 (在线程中执行，失败时忽略)"""
+        try:
+            self.cover_cache_dir.mkdir(parents=True, exist_ok=True)
+            self._cover_cache_path(url).write_bytes(content)
+            entries = [(entry.stat(), entry) for entry in self.cover_cache_dir.iterdir() if entry.is_file()]
+            total = sum(st.st_size for st, _ in entries)
+            for st, entry in sorted(entries, key=lambda item: item[0].st_mtime):
+                if total <= self.COVER_CACHE_MAX_BYTES:
+                    break
+                entry.unlink(missing_ok=True)
+                total -= st.st_size
+        except OSError as e:
+            print(f"封面缓存写入失败: {e}")
+
+    async def _decode_cover(self, url: str, content: bytes) -> Image.Image:
+        """[异步] 完整解码下载到的图片 (损坏时在此抛出)，开启缓存时写入磁盘"""
+        image = Image.open(BytesIO(content))
+        image.load()
+        if self.cover_cache_dir is not None:
+            await asyncio.to_thread(self._store_cached_cover, url, content)
+        return image
+
+    async def download_image(self, url: str) -> Image.Image:
+        """[异步] 下载图片 (开启缓存时优先读取磁盘缓存)"""
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0",
         }
         if not url:
             return Image.new('RGB', (600, 600), color='#D3D3D3')
+        if self.cover_cache_dir is not None:
+            cached = await asyncio.to_thread(self._load_cached_cover, url)
+            if cached is not None:
+                return cached
         try:
-            async with aiohttp.ClientSession(headers=headers, trust_env=True) as session:
-                async with session.get(url, timeout=10) as resp:
-                    if resp.status != 200:
-                        print(f"图片下载失败: {resp.status}，尝试使用 TLS 指纹...")
-                        try:
-                            from curl_cffi import requests
-                            response = requests.get(
-                                url,
-                                impersonate="chrome110"
-                            )
-                            return Image.open(BytesIO(response.content))
-                        except Exception as e:
-                            print(f"图片下载出错: {e}")
-                        return Image.new('RGB', (600, 600), color='#D3D3D3')
-                    content = await resp.read()
-                    return Image.open(BytesIO(content))
+            async with self._get(url, headers=headers, timeout=self.IMAGE_TIMEOUT) as resp:
+                if resp.status == 200:
+                    return await self._decode_cover(url, await resp.read())
+                print(f"图片下载失败: {resp.status}，尝试使用 TLS 指纹...")
         except Exception as e:
             print(f"图片下载出错: {e}")
             return Image.new('RGB', (600, 600), color='#D3D3D3')
 
-    @staticmethod
-    async def fetch_ncm_song_info(music_id: str) -> Optional[Dict]:
+        # 回退：异步请求，不阻塞事件循环中的其它下载与解析
+        try:
+            async with self._semaphore:
+                curl_session = await self._get_curl_session()
+                response = await curl_session.get(url)
+            return await self._decode_cover(url, response.content)
+        except Exception as e:
+            print(f"图片下载出错: {e}")
+        return Image.new('RGB', (600, 600), color='#D3D3D3')
+
+    async def fetch_ncm_song_info(self, music_id: str) -> Optional[Dict]:
         """[异步] 获取网易云音乐歌曲详情"""
         url = f"https://music.163.com/api/song/detail/?id={music_id}&ids=%5B{music_id}%5D"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"}
         print(f"正在从 NCM API 获取 ID {music_id} 的信息...")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as resp:
-                    if resp.status != 200: return None
-                    text_resp = await resp.text()
-                    data = json.loads(text_resp)
-                    if not data.get('songs'): return None
-                    song = data['songs'][0]
-                    return {
-                        "title": song['name'],
-                        "artist": " / ".join([a['name'] for a in song['artists']]),
-                        "cover_url": song['album']['picUrl'],
-                        "music_id": music_id
-                    }
+            async with self._get(url) as resp:
+                if resp.status != 200: return None
+                data = orjson.loads(await resp.read())
+                if not data.get('songs'): return None
+                song = data['songs'][0]
+                return {
+                    "title": song['name'],
+                    "artist": " / ".join([a['name'] for a in song['artists']]),
+                    "cover_url": song['album']['picUrl'],
+                    "music_id": music_id
+                }
         except Exception as e:
             print(f"NCM API Error: {e}")
             return None
 
-    @staticmethod
-    async def fetch_qq_music_info(music_id: str, cookie: str) -> Optional[Dict]:
+    async def fetch_qq_music_info(self, music_id: str, cookie: str) -> Optional[Dict]:
         """[异步] 获取 QQ 音乐歌曲详情"""
         url = f"https://y.qq.com/n/ryqq_v2/songDetail/{music_id}"
         headers = {
             "Accept": "*/*",
             "Connection": "keep-alive",
             "Cookie": cookie,
-            "User-Agent": """Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"""
         }
         print(f"正在访问 QQ 音乐网页端获取 ID {music_id} 的信息...")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as resp:
-                    if resp.status != 200: return None
-                    text_resp = await resp.text()
-                    begin_index = text_resp.find("""window.__INITIAL_DATA__ =""") + 25
-                    end_index = text_resp.find("""</script>""", begin_index)
-                    if begin_index == 24 or end_index == -1 or end_index <= begin_index: return None
-                    data = json.loads(text_resp[begin_index: end_index].replace('undefined', 'null'))
-                    if not data.get('detail'): return None
-                    song = data['songList'][0]
-                    return {
-                        "title": f"{song['title']} ({song['subtitle']})" if song['subtitle'] and len(
-                            song['subtitle']) else song['title'],
-                        "artist": " / ".join([singer['name'] for singer in song['singer']]),
-                        "cover_url": f"https://y.qq.com/music/photo_new/T002R1200x1200M000{song['album']['mid']}.jpg",
-                        "music_id": music_id
-                    }
+            async with self._get(url, headers=headers) as resp:
+                if resp.status != 200: return None
+                raw = await resp.read()
+                match = QQ_INITIAL_DATA_PATTERN.search(raw)
+                if not match or not match.group(1).strip(): return None
+                data = orjson.loads(_js_undefined_to_null(match.group(1)))
+                if not data.get('detail'): return None
+                song = data['songList'][0]
+                return {
+                    "title": f"{song['title']} ({song['subtitle']})" if song['subtitle'] and len(
+                        song['subtitle']) else song['title'],
+                    "artist": " / ".join([singer['name'] for singer in song['singer']]),
+                    "cover_url": f"https://y.qq.com/music/photo_new/T002R1200x1200M000{song['album']['mid']}.jpg",
+                    "music_id": music_id
+                }
         except Exception as e:
             print(f"NCM API Error: {e}")
             return None
 
-    @staticmethod
-    async def fetch_daily_recommendation(date_str: str) -> Optional[Dict]:
+    async def fetch_daily_recommendation(self, date_str: str) -> Optional[Dict]:
         """
         [异步] 获取每日推荐 (API Priority 1)
         URL: https://amlldb.bikonoo.com/api/daily-recommendations?date={date}
@@ -148,30 +388,55 @@ class MusicCard:
         url = f"https://amlldb.bikonoo.com/api/daily-recommendations?date={date_str}"
         print(f"正在获取 {date_str} 的每日推荐...")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as resp:
-                    if resp.status != 200:
-                        print(f"Error: {resp.status}")
-                        return None
-
-                    # API 可能返回 "null" 或 JSON 对象
-                    text_resp = await resp.text()
-                    if not text_resp or text_resp.strip() == "null":
-                        print("该日期无每日推荐数据")
-                        return None
-
-                    data = json.loads(text_resp)
-                    # 校验返回数据是否有效
-                    if not isinstance(data, dict) or 'ncm_id' not in data:
-                        return None
-
-                    return {
-                        "music_id": data.get('ncm_id'),
-                        "date": data.get('date'),  # "2025-12-17"
-                        "username": data.get('username'),  # -> quote_source
-                        "comment": data.get('comment'),  # -> quote_content
-                        "cover_path": data.get('cover')  # -> cover_url
-                    }
+            async with self._get(url) as resp:
+                if resp.status != 200:
+                    print(f"Error: {resp.status}")
+                    return None
+
+                # API 可能返回 "null" 或 JSON 对象
+                raw = await resp.read()
+                if not raw or raw.strip() == b"null":
+                    print("该日期无每日推荐数据")
+                    return None
+
+                data = orjson.loads(raw)
+                # 校验返回数据是否有效
+                if not isinstance(data, dict) or 'ncm_id' not in data:
+                    return None
+
+                return {
+                    "music_id": data.get('ncm_id'),
+                    "date": data.get('date'),  # "2025-12-17"
+                    "username": data.get('username'),  # -> quote_source
+                    "comment": data.get('comment'),  # -> quote_content
+                    "cover_path": data.get('cover')  # -> cover_url
+                }
+        except Exception as e:
+            print(f"Error: {e}")
+            return None
+
+    async def fetch_lines(self, music_id: str) -> Optional[str]:
+        """[异步] 从 AMLL TTML 数据库获取歌词，并转换为引言文本"""
+        folder = {
+            "ncm": "ncm-lyrics",
+            "qq": "qq-lyrics"
+        }
+        url = f"{TTML_DB_URL_PREFIX}/{folder[self.platform]}/{music_id}.ttml"
+        print(f"正在从 {url} 获取 {music_id} 的 TTML 文件...")
+        try:
+            async with self._get(url) as resp:
+                if resp.status != 200:
+                    print(f"Error: {resp.status}")
+                    return None
+
+                # API 可能返回 "null" 或 JSON 对象
+                # 直接读原始字节交给 lxml，由 XML 声明决定编码，省去 resp.text() 的字符集探测与解码
+                raw = await resp.read()
+                if not raw or raw.strip() == b"null":
+                    print("该 ID 所对应歌词还无人制作")
+                    return None
+
+                return TTML(raw).text
         except Exception as e:
             print(f"Error: {e}")
             return None
@@ -179,23 +444,53 @@ class MusicCard:
     # --- 图像处理算法 ---
 
     @staticmethod
-    def get_dominant_color(image: Image.Image):
-        return image.copy().resize((1, 1), resample=Image.Resampling.HAMMING).getpixel((0, 0))
+    def _thumb(image: Image.Image, size: int = 32, max_area: int = 256 * 256) -> Image.Image:
+        """
+        缩成小图用于取色。
+        背景上裁出的小区域直接交给 NumPy 求均值，比先重采样更快；只有封面这类大图才缩小。
+        """
+        if image.width * image.height <= max_area:
+            return image
+        return image.resize((min(size, image.width), min(size, image.height)), Image.Resampling.BOX)
 
-    @staticmethod
-    def get_adaptive_month_color(bg_sample, theme_rgb):
-        bg_color = bg_sample.resize((1, 1), resample=Image.Resampling.HAMMING).getpixel((0, 0))
-        bg_lum = (bg_color[0] * 299 + bg_color[1] * 587 + bg_color[2] * 114) / 1000
+    @classmethod
+    def _sample_array(cls, sample: Image.Image) -> np.ndarray:
+        """取色样本 (缩略后) 转为 (H, W, C) 数组"""
+        arr = np.asarray(cls._thumb(sample))
+        return arr if arr.ndim == 3 else arr[..., np.newaxis]
+
+    @classmethod
+    def _mean_color(cls, image: Image.Image) -> tuple[int, ...]:
+        """图像的平均颜色"""
+        arr = cls._sample_array(image)
+        return tuple(int(round(c)) for c in arr.reshape(-1, arr.shape[-1]).mean(axis=0))
+
+    @classmethod
+    def _mean_luma(cls, image: Image.Image, max_samples: int = 256) -> float:
+        """
+        图像的平均感知亮度 (ITU-R 601: 0.299R + 0.587G + 0.114B)，一次 NumPy 运算完成。
+        仅用于明暗阈值判断，按步长隔行隔列抽样 (约 max_samples 个像素) 即可，不必遍历整块区域。
+        """
+        arr = cls._sample_array(image)
+        step = max(1, int((arr.shape[0] * arr.shape[1] / max_samples) ** 0.5))
+        return float((arr[::step, ::step, :3] @ np.array([0.299, 0.587, 0.114])).mean())
+
+    @classmethod
+    def get_dominant_color(cls, image: Image.Image):
+        return cls._mean_color(image)
+
+    @classmethod
+    def get_adaptive_month_color(cls, bg_sample, theme_rgb):
+        bg_lum = cls._mean_luma(bg_sample)
 
         def adjust(c, factor):
             return tuple(min(255, max(0, int(i * factor))) for i in c)
 
         return adjust(theme_rgb, 0.6) if bg_lum > 140 else adjust(theme_rgb, 1.8)
 
-    @staticmethod
-    def get_adaptive_deco_color(bg_sample, theme_rgb):
-        bg_color = bg_sample.resize((1, 1), resample=Image.Resampling.HAMMING).getpixel((0, 0))
-        bg_lum = (bg_color[0] * 299 + bg_color[1] * 587 + bg_color[2] * 114) / 1000
+    @classmethod
+    def get_adaptive_deco_color(cls, bg_sample, theme_rgb):
+        bg_lum = cls._mean_luma(bg_sample)
 
         def blend(c1, c2, ratio):
             return tuple(int(c1[i] * (1 - ratio) + c2[i] * ratio) for i in range(3))
@@ -204,30 +499,24 @@ class MusicCard:
         # 亮背景混白色20%，暗背景混白色60%
         return blend(theme_rgb, white, 0.2) if bg_lum > 150 else blend(theme_rgb, white, 0.6)
 
-    @staticmethod
-    def get_contrasting_text_color(region_image):
-        color = region_image.resize((1, 1), resample=Image.Resampling.HAMMING).getpixel((0, 0))
-        lum = (color[0] * 299 + color[1] * 587 + color[2] * 114) / 1000
+    @classmethod
+    def get_contrasting_text_color(cls, region_image):
+        lum = cls._mean_luma(region_image)
         return "#4a3b32" if lum > 120 else "#f2f2f2"
 
     @staticmethod
     def _get_relative_luminance(rgb):
-        """计算 sRGB 颜色的相对亮度"""
-        r, g, b = [x / 255.0 for x in rgb]
-        r = r / 12.92 if r <= 0.03928 else ((r + 0.055) / 1.055) ** 2.4
-        g = g / 12.92 if g <= 0.03928 else ((g + 0.055) / 1.055) ** 2.4
-        b = b / 12.92 if b <= 0.03928 else ((b + 0.055) / 1.055) ** 2.4
-        return 0.2126 * r + 0.7152 * g + 0.0722 * b
+        """计算 sRGB 颜色的相对亮度 (支持形如 (..., 3) 的数组批量计算)"""
+        c = np.asarray(rgb, dtype=np.float64) / 255.0
+        c = np.where(c <= 0.03928, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+        return c @ np.array([0.2126, 0.7152, 0.0722])
 
     @classmethod
     def _get_contrast_ratio(cls, rgb1, rgb2):
         """计算两种颜色之间的对比度"""
         lum1 = cls._get_relative_luminance(rgb1)
         lum2 = cls._get_relative_luminance(rgb2)
-        if lum1 > lum2:
-            return (lum1 + 0.05) / (lum2 + 0.05)
-        else:
-            return (lum2 + 0.05) / (lum1 + 0.05)
+        return (np.maximum(lum1, lum2) + 0.05) / (np.minimum(lum1, lum2) + 0.05)
 
     @classmethod
     def get_safe_qr_color(cls, theme_rgb, bg_color_rgb=(253, 253, 253)):
@@ -238,41 +527,40 @@ class MusicCard:
         """
         min_contrast_ratio = 4.5
 
-        current_color = list(theme_rgb)
-
-        # 循环调整，直到对比度达标
-        while cls._get_contrast_ratio(tuple(current_color), bg_color_rgb) < min_contrast_ratio:
-            # 如果已经是纯黑，则停止
-            if current_color[0] <= 5 and current_color[1] <= 5 and current_color[2] <= 5:
-                return 0, 0, 0
-
-            # 按比例调暗颜色
-            current_color[0] = max(0, int(current_color[0] * 0.9))
-            current_color[1] = max(0, int(current_color[1] * 0.9))
-            current_color[2] = max(0, int(current_color[2] * 0.9))
+        # 预先生成逐步调暗 (每次 ×0.9) 的候选色，直到接近纯黑
+        candidates = [tuple(theme_rgb)]
+        r, g, b = theme_rgb
+        while not (r <= 5 and g <= 5 and b <= 5):
+            r, g, b = max(0, int(r * 0.9)), max(0, int(g * 0.9)), max(0, int(b * 0.9))
+            candidates.append((r, g, b))
 
-        return tuple(current_color)
+        # 所有候选色一次性批量计算对比度 (背景亮度只计算一次)
+        ratios = cls._get_contrast_ratio(candidates, bg_color_rgb)
+        passed = np.flatnonzero(ratios >= min_contrast_ratio)
+        if passed.size == 0:
+            return 0, 0, 0
+        return candidates[passed[0]]
 
     @staticmethod
     def generate_styled_qrcode(data, theme_color, size=120):
         qr = qrcode.QRCode(version=1, border=1, box_size=10)
         qr.add_data(data)
         qr.make(fit=True)
-        qr_img = qr.make_image(fill_color="black", back_color="white").convert("RGBA")
 
-        new_data = []
+        # 直接由模块矩阵 (含边框) 按 box_size 放大得到蒙版，不经 qrcode 的 PIL 渲染
+        # 黑色 -> 主题色带透明度; 白色 -> 透明
+        mask = np.array(qr.get_matrix(), dtype=bool).repeat(qr.box_size, axis=0).repeat(qr.box_size, axis=1)
         tr, tg, tb = theme_color
-        for item in qr_img.getdata():
-            # 黑色 -> 主题色带透明度; 白色 -> 透明
-            if item[0] < 128:
-                new_data.append((tr, tg, tb, 230))
-            else:
-                new_data.append((255, 255, 255, 0))
-        qr_img.putdata(new_data)
-        return qr_img.resize((size, size), Image.Resampling.LANCZOS)
+        out = np.empty(mask.shape + (4,), dtype=np.uint8)
+        out[..., 0] = np.where(mask, tr, 255)
+        out[..., 1] = np.where(mask, tg, 255)
+        out[..., 2] = np.where(mask, tb, 255)
+        out[..., 3] = np.where(mask, 230, 0)
+        return Image.fromarray(out).resize((size, size), Image.Resampling.LANCZOS)
 
     @staticmethod
     def create_gradient_mask(w, h):
+        # 不缓存：h 随卡片内容高度变化，缓存几乎不会命中，反而长期持有整张卡片大小的蒙版
         ending = 0.9
         limit = 255 * ending
         break_percent = 0.5
@@ -285,31 +573,56 @@ class MusicCard:
         # exponent = 0.5  -> 甚至比线性更加激进 (一过 break_h 就迅速变黑)
         exponent = 1.5
 
-        data = []
-        for y in range(h):
-            if y < break_h:
-                val = int(break_opa * (y / break_h)) if break_h > 0 else 0
-            else:
-                denom = h - break_h
-                ratio = (y - break_h) / denom if denom > 0 else 1
+        y = np.arange(h, dtype=np.float64)
+        # 前段：线性渐变到 break_opa
+        head = break_opa * (y / break_h) if break_h > 0 else np.zeros(h)
+        # 后段：对 ratio 进行非线性处理
+        denom = h - break_h
+        ratio = (y - break_h) / denom if denom > 0 else np.ones(h)
+        tail = break_opa + (limit - break_opa) * np.clip(ratio, 0, None) ** exponent
+        data = np.where(y < break_h, head, tail).astype(np.uint8)
 
-                # ==========【核心修改】==========
-                # 对 ratio 进行非线性处理
-                ratio = ratio ** exponent
-                # ==============================
+        gradient = Image.frombuffer('L', (1, h), data.tobytes(), 'raw', 'L', 0, 1)
+        return gradient.resize((w, h), Image.Resampling.NEAREST)
 
-                val = int(break_opa + (limit - break_opa) * ratio)
-            data.append(val)
+    @staticmethod
+    def _draw_rounded_mask(size, radius):
+        """按原尺寸绘制圆角矩形，再用轻微的高斯模糊羽化边缘"""
+        w, h = size
+        # Pillow 的矩形框包含右下边界，须用 (w - 1, h - 1)，否则右、下两侧的圆角会外移 1px 被裁掉
+        mask = Image.new("L", size, 0)
+        ImageDraw.Draw(mask).rounded_rectangle((0, 0, w - 1, h - 1), radius=radius, fill=255)
+        return mask.filter(ImageFilter.GaussianBlur(0.6))
 
-        gradient = Image.new('L', (1, h))
-        gradient.putdata(data)
-        return gradient.resize((w, h))
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _rounded_corner_template(radius):
+        """四角模板：边长 2 * (radius + 4) 的完整圆角蒙版 (按半径缓存，调用方不可修改)"""
+        corner = radius + 4
+        return MusicCard._draw_rounded_mask((corner * 2, corner * 2), radius)
 
     @staticmethod
-    def create_rounded_mask(size, radius):
+    def create_rounded_mask(size, radius, high_quality=False):
         """
         [改进] 创建带抗锯齿效果的圆角蒙版。
+        :param high_quality: 使用 8 倍超采样 + LANCZOS 缩小 (更平滑，但开销大得多)
         """
+        if not high_quality:
+            w, h = size
+            corner = radius + 4  # 圆角 + 羽化所影响的范围
+            if w > corner * 2 and h > corner * 2:
+                # 只有四角需要绘制，其余部分恒为 255。从缓存的四角模板拼出，结果与整张绘制完全一致
+                # (卡片高度随内容变化，整张蒙版几乎不会重复，因此只缓存模板)
+                tpl = MusicCard._rounded_corner_template(radius)
+                mask = Image.new("L", size, 255)
+                mask.paste(tpl.crop((0, 0, corner, corner)), (0, 0))
+                mask.paste(tpl.crop((corner, 0, corner * 2, corner)), (w - corner, 0))
+                mask.paste(tpl.crop((0, corner, corner, corner * 2)), (0, h - corner))
+                mask.paste(tpl.crop((corner, corner, corner * 2, corner * 2)), (w - corner, h - corner))
+                return mask
+
+            return MusicCard._draw_rounded_mask(size, radius)
+
         # 1. 超采样：定义一个放大倍数，2倍、4倍或更高
         upscale_factor = 8
 
@@ -330,6 +643,28 @@ class MusicCard:
         #    Image.Resampling.LANCZOS 是高质量的缩小算法，能产生平滑的边缘
         return mask.resize(size, Image.Resampling.LANCZOS)
 
+    @cached_property
+    def _dot_strip(self) -> Image.Image:
+        """预渲染的圆点分隔线 (每 20px 一个 4px 圆点)，首次制图时生成，绘制时整条贴上"""
+        return self._create_dot_strip(self.CONTENT_RIGHT_X - self.CONTENT_LEFT_X, self.C_ACCENT)
+
+    @staticmethod
+    def _create_dot_strip(width, color, step=20, dot=4):
+        """预渲染一条圆点分隔线 (RGBA，透明底)"""
+        strip = Image.new("RGBA", (width + dot + 1, dot + 1), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(strip)
+        for x in range(0, width, step):
+            draw.ellipse((x, 0, x + dot, dot), fill=color)
+        return strip
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _create_dash_mask(length, step=4):
+        """预渲染一行点状虚线的蒙版 (1 像素高，每 step 像素一个点)"""
+        row = np.zeros((1, max(1, length)), dtype=np.uint8)
+        row[0, ::step] = 255
+        return Image.fromarray(row)
+
     # --- 布局与绘制 ---
 
     @staticmethod
@@ -337,25 +672,41 @@ class MusicCard:
         """
         检查字符串是否包含 CJK 字符。
         """
-        for char in text:
-            # CJK 统一表意文字 U+4E00..U+9FFF
-            # CJK 兼容表意文字 U+F900..U+FAFF
-            # ... 还有很多，但这个范围已经能覆盖绝大部分场景
-            if '\u4e00' <= char <= '\u9fff':
-                return True
-        return False
-
-    def _process_text_wrapping(self, draw, text, font, max_width):
+        # CJK 还有很多区段，但这个范围已经能覆盖绝大部分场景
+        return CJK_PATTERN.search(text) is not None
+
+    @staticmethod
+    def _parse_quote_lines(quote_content: str) -> tuple[list[tuple[Optional[str], str]], bool]:
+        """
+        解析引言文本的行首标记。
+        :return: ([(spec, text), ...], 是否所有带标记的行均为居中)
+        """
+        raw_lines = []
+        pure_center = True
+        for line in quote_content.split('\n'):
+            match = QUOTE_SPEC_PATTERN.match(line.strip())
+            if match:
+                spec, text_content = match.groups()
+                raw_lines.append((spec, text_content.strip()))
+                if spec != '-':
+                    pure_center &= spec == ':-:' or spec == ':_:'
+            else:
+                raw_lines.append((None, line.strip()))
+        return raw_lines, pure_center
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _wrap_text(text, font, max_width):
         """
         [最终国际化版] 智能换行方法。
         - 对 CJK 文本进行逐字换行，不加连字符。
         - 对西文文本进行单词间换行，并为超长单词自动添加连字符。
+        - 按 (文本, 字体, 宽度) 缓存，高度测算与实际绘制、以及多次生成之间共用结果。
         """
         final_lines: list[str] = []
 
         # 获取基础行高
-        bbox = font.getbbox("高")
-        line_height = bbox[3] - bbox[1]
+        line_height = _line_height(font)
 
         for paragraph in text.split('\n'):
             paragraph = paragraph.strip()
@@ -365,20 +716,31 @@ class MusicCard:
                 continue
 
             # --- 判断文本类型，选择不同策略 ---
-            if self.contains_cjk(paragraph):
+            if MusicCard.contains_cjk(paragraph):
                 # --- 策略 A: CJK 文本处理 (逐字换行) ---
+                # 逐字累加字符宽度，仅在接近行宽时才对整行做一次精确测量 (字偶距)
                 current_line = ""
+                current_w = 0.0
                 for char in paragraph:
-                    if draw.textlength(current_line + char, font=font) <= max_width:
+                    char_w = _char_width(font, char)
+                    if current_w + char_w * 2 <= max_width:
                         current_line += char
+                        current_w += char_w
+                        continue
+                    exact_w = font.getlength(current_line + char)
+                    if exact_w <= max_width:
+                        current_line += char
+                        current_w = exact_w
                     else:
                         if ' ' in current_line:
                             final_lines.append(current_line[:current_line.rindex(' ')])
                             current_line = current_line[current_line.rindex(' ') + 1:]
                             current_line += char
+                            current_w = font.getlength(current_line)
                         else:
                             final_lines.append(current_line)
                             current_line = char
+                            current_w = char_w
                 if current_line:
                     final_lines.append(current_line)
             else:
@@ -387,21 +749,30 @@ class MusicCard:
                 current_line = ""
                 for word in words:
                     # 处理单个单词超长的情况
-                    word_width = draw.textlength(word, font=font)
+                    word_width = font.getlength(word)
                     if word_width > max_width:
                         if current_line:
                             final_lines.append(current_line)
                             current_line = ""
 
-                        hyphen_width = draw.textlength("-", font=font)
+                        hyphen_width = font.getlength("-")
                         effective_max_width = max_width - hyphen_width
                         temp_chunk = ""
+                        temp_w = 0.0
                         for char in word:
-                            if draw.textlength(temp_chunk + char, font=font) <= effective_max_width:
+                            char_w = _char_width(font, char)
+                            if temp_w + char_w * 2 <= effective_max_width:
+                                temp_chunk += char
+                                temp_w += char_w
+                                continue
+                            exact_w = font.getlength(temp_chunk + char)
+                            if exact_w <= effective_max_width:
                                 temp_chunk += char
+                                temp_w = exact_w
                             else:
                                 final_lines.append(temp_chunk + "-")
                                 temp_chunk = char
+                                temp_w = char_w
                         if temp_chunk:
                             current_line = temp_chunk
                         continue
@@ -409,7 +780,7 @@ class MusicCard:
                     # 正常的单词拼接逻辑
                     separator = " " if current_line else ""
                     test_line = current_line + separator + word
-                    if draw.textlength(test_line, font=font) <= max_width:
+                    if font.getlength(test_line) <= max_width:
                         current_line = test_line
                     else:
                         final_lines.append(current_line)
@@ -417,30 +788,54 @@ class MusicCard:
                 if current_line:
                     final_lines.append(current_line)
 
-        return final_lines, line_height
+        return tuple(final_lines), line_height
 
     @staticmethod
     def _draw_text_right(draw, text, font, right_x, y, fill):
-        w = draw.textlength(text, font=font)
+        w = _text_width(font, text)
         draw.text((right_x - w, y), text, font=font, fill=fill)
 
     async def generate(self,
                        data: Dict[str, Any],
                        inner_blurred: bool = False,
                        show_qrcode: bool = False,
-                       mode: str = DAILY) -> Image.Image:
+                       mode: CardMode | str = DAILY,
+                       cover_img: Optional[Image.Image] = None) -> Image.Image:
         """
         生成音乐卡片的核心方法
         :param data: 包含 title, artist, cover_url, quote_content, quote_source, date_obj, music_id
         :param inner_blurred: 是否开启内部模糊
         :param show_qrcode: 是否显示二维码
         :param mode: 制卡模式
+        :param cover_img: 已提前下载好的封面 (为空时按 cover_url 下载)
         :return: PIL.Image 对象
         """
+        # 下载资源
+        if cover_img is None:
+            cover_url = data.get('cover_url', '')
+            print(f"下载封面: {cover_url}")
+            cover_img = await self.download_image(cover_url)
+
+        mode = CardMode(mode)
+
+        # 绘图均为 CPU 密集的同步操作，放到线程池中执行，避免阻塞事件循环
+        return await asyncio.to_thread(self._render, data, cover_img, inner_blurred, show_qrcode, mode)
+
+    def _render(self,
+                data: Dict[str, Any],
+                cover_img: Image.Image,
+                inner_blurred: bool,
+                show_qrcode: bool,
+                mode: CardMode) -> Image.Image:
+        """
+        [同步] 排版并绘制卡片
+        :param cover_img: 已下载的封面图
+        """
+        is_daily = mode is CardMode.DAILY
+        is_card = mode is CardMode.CARD
         # 准备数据
         title = data.get('title', '')
         artist = data.get('artist', '')
-        cover_url = data.get('cover_url', '')
         quote_content = data.get('quote_content', '')
         quote_source = data.get('quote_source', '')
         date_obj = data.get('date_obj', datetime.now())
@@ -449,23 +844,19 @@ class MusicCard:
         date_month_str = calendar.month_abbr[date_obj.month]
         date_day_int = date_obj.day
 
-        # 下载资源
-        print(f"下载封面: {cover_url}")
-        cover_img_raw = (await self.download_image(cover_url)).convert("RGB")
-        theme_rgb = self.get_dominant_color(cover_img_raw)
-        print(f"识别主题色: {theme_rgb}")
-        
-
+        if not self.font_path:
+            print("未指定字体，无法制图")
+            return Image.new('RGB', (100, 100), color='red')
         try:
-            font_title = ImageFont.truetype(self.font_path, 44, index=self.Semibold)
-            font_artist = ImageFont.truetype(self.font_path, 26, index=self.Semibold)
-            font_date_num = ImageFont.truetype(self.font_path, 90, index=self.Medium)
-            font_date_month = ImageFont.truetype(self.font_path, 40, index=self.Medium)
-            font_quote = ImageFont.truetype(self.font_path, 34, index=self.Regular)
-            font_quote_sub = ImageFont.truetype(self.font_path, 26, index=self.Light)
-            font_deco = ImageFont.truetype(self.font_path, 100, index=self.Medium)
-            font_fc = ImageFont.truetype(self.font_path, 32, index=self.Thin)
-            font_fo = ImageFont.truetype(self.font_path, 22, index=self.Regular)
+            font_title = _load_font(self.font_path, 44, self.Semibold)
+            font_artist = _load_font(self.font_path, 26, self.Semibold)
+            font_date_num = _load_font(self.font_path, 90, self.Medium)
+            font_date_month = _load_font(self.font_path, 40, self.Medium)
+            font_quote = _load_font(self.font_path, 34, self.Regular)
+            font_quote_sub = _load_font(self.font_path, 26, self.Light)
+            font_deco = _load_font(self.font_path, 100, self.Medium)
+            font_fc = _load_font(self.font_path, 32, self.Thin)
+            font_fo = _load_font(self.font_path, 22, self.Regular)
         except IOError:
             print(f"字体加载失败: {self.font_path}")
             return Image.new('RGB', (100, 100), color='red')
@@ -479,11 +870,9 @@ class MusicCard:
         if show_qrcode and music_id:
             text_w -= (QR_SIZE + QR_GAP)
 
-        temp_draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
-
         # 头部文本高度
-        t_lines, t_h = self._process_text_wrapping(temp_draw, title, font_title, text_w)
-        a_lines, a_h = self._process_text_wrapping(temp_draw, artist, font_artist, text_w)
+        t_lines, t_h = self._wrap_text(title, font_title, text_w)
+        a_lines, a_h = self._wrap_text(artist, font_artist, text_w)
 
         text_block_h = (len(t_lines) * t_h * 1.3) + 15 + (len(a_lines) * a_h * 1.5)
 
@@ -506,31 +895,22 @@ class MusicCard:
 
                 # 中间区域 (日期 & 引言)
                 q_x = self.CONTENT_LEFT_X
-                if mode == self.DAILY:
+                if is_daily:
                     q_x += 240
                 q_max_w = self.CONTENT_RIGHT_X - q_x
 
                 # -- 精确计算引言/歌词区域高度 --
                 q_h_real = 0
-                font_quote_small = ImageFont.truetype(self.font_path, int(font_quote.size * 0.8), index=self.Regular)
-                q_bbox = font_quote.getbbox("高")
-                q_font_h = q_bbox[3] - q_bbox[1]
-                small_q_bbox = font_quote_small.getbbox("高")
-                small_q_font_h = small_q_bbox[3] - small_q_bbox[1]
-
-                lines = quote_content.split('\n')
-                raw_lines = []
-                pure_center = True
-                for line in lines:
-                    match = re.match(r'^\[([:_-]+)\](.*)', line.strip())
-                    if match:
-                        spec, text_content = match.groups()
-                        text_content = text_content.strip()
-                        raw_lines.append((spec, text_content))
-                        if spec != '-':
-                            pure_center &= spec == ':-:' or spec == ':_:'
-                    else:
-                        raw_lines.append((None, line.strip()))
+                font_quote_small = _load_font(self.font_path, int(font_quote.size * 0.8), self.Regular)
+                q_font_h = _line_height(font_quote)
+                small_q_font_h = _line_height(font_quote_small)
+                # 行距 (1.6 倍行高)，测算与绘制共用
+                q_line_adv = q_font_h * 1.6
+                small_q_line_adv = small_q_font_h * 1.6
+
+                raw_lines, pure_center = self._parse_quote_lines(from_html_escaped(quote_content))
+                # 带对齐标记行的换行宽度 (非纯居中时为 80%)
+                spec_wrap_width = q_max_w * (1 if pure_center else 0.8)
                 for spec, text_content in raw_lines:
                     if spec:
                         if spec == '-':
@@ -541,19 +921,18 @@ class MusicCard:
                         else:
                             use_small_font = '_' in spec or spec == '-'
                             target_font = font_quote_small if use_small_font else font_quote
-                            target_font_h = small_q_font_h if use_small_font else q_font_h
-                            wrap_width = q_max_w * (1 if pure_center else 0.8)
-                            wrapped_sub_lines, _ = self._process_text_wrapping(temp_draw, text_content.strip(), target_font,
-                                                                               wrap_width)
-                            q_h_real += len(wrapped_sub_lines) * target_font_h * 1.6
+                            target_line_adv = small_q_line_adv if use_small_font else q_line_adv
+                            wrapped_sub_lines, _ = self._wrap_text(text_content.strip(), target_font,
+                                                                   spec_wrap_width)
+                            q_h_real += len(wrapped_sub_lines) * target_line_adv
                     else:
                         if not text_content.strip():
-                            q_h_real += q_font_h * 1.6
+                            q_h_real += q_line_adv
                             continue
-                        wrapped_sub_lines, _ = self._process_text_wrapping(temp_draw, text_content, font_quote, q_max_w)
-                        q_h_real += len(wrapped_sub_lines) * q_font_h * 1.6
+                        wrapped_sub_lines, _ = self._wrap_text(text_content, font_quote, q_max_w)
+                        q_h_real += len(wrapped_sub_lines) * q_line_adv
 
-                if mode == self.DAILY:
+                if is_daily:
                     # DAILY 模式: 保留为来源和底部预留的完整边距
                     q_h = q_h_real + 40 + 30
                     footer_inner_h = 20 + 20 + 32 + 25
@@ -567,13 +946,20 @@ class MusicCard:
         # 总高度
         cover_size = self.MAX_TEXT_W
         total_card_h = self.INNER_PAD + cover_size + header_section_h + footer_inner_h
-        if mode != self.CARD:
+        if not is_card:
             total_card_h += 30 + middle_h
         total_img_h = int(total_card_h + self.MARGIN_TOP + self.MARGIN_BOTTOM)
 
-        # 绘制主背景
-        bg_img = ImageOps.fit(cover_img_raw, (self.W, total_img_h), method=Image.Resampling.LANCZOS)
-        bg_img = bg_img.filter(ImageFilter.GaussianBlur(radius=100))
+        cover_img_raw = cover_img.convert("RGB")
+        theme_rgb = self.get_dominant_color(cover_img_raw)
+        print(f"识别主题色: {theme_rgb}")
+
+        # 绘制主背景 (在 1/8 分辨率上模糊后放大，效果等同于原尺寸 radius=100 的模糊)
+        blur_scale = 8
+        bg_small = ImageOps.fit(cover_img_raw, (self.W // blur_scale, max(1, total_img_h // blur_scale)),
+                                method=Image.Resampling.BILINEAR)
+        bg_small = bg_small.filter(ImageFilter.GaussianBlur(radius=100 / blur_scale))
+        bg_img = bg_small.resize((self.W, total_img_h), Image.Resampling.BILINEAR)
         bg_img = ImageEnhance.Brightness(bg_img).enhance(0.7)
 
         # 卡片背景
@@ -634,17 +1020,16 @@ class MusicCard:
             bg_img.paste(qr_img, (qr_x, qr_y), qr_img)
 
         sep_y = header_start_y + header_h_real
-        if mode != self.CARD:
+        if not is_card:
             # 分隔线
             sep_y = header_start_y + header_h_real + 30
-            for x in range(self.CONTENT_LEFT_X, self.CONTENT_RIGHT_X, 20):
-                draw.ellipse((x, sep_y, x + 4, sep_y + 4), fill=self.C_ACCENT)
+            bg_img.paste(self._dot_strip, (self.CONTENT_LEFT_X, int(sep_y)), self._dot_strip)
 
             mid_y = sep_y + 40
 
             # 绘制中间部分
 
-            if mode == self.DAILY:
+            if is_daily:
                 # 日期
                 date_x = self.CONTENT_LEFT_X + 20
                 month_color = self.get_adaptive_month_color(
@@ -652,30 +1037,17 @@ class MusicCard:
                 )
                 draw.text((date_x, mid_y), date_month_str, font=font_date_month, fill=month_color)
 
-                m_bbox = font_date_month.getbbox("A")
-                draw.text((date_x, mid_y + (m_bbox[3] - m_bbox[1]) + 10), str(date_day_int), font=font_date_num,
-                          fill=self.C_MAIN)
+                draw.text((date_x, mid_y + _line_height(font_date_month, "A") + 10), str(date_day_int),
+                          font=font_date_num, fill=self.C_MAIN)
 
             # 引言
             q_curr_y = mid_y + 5
-            # 获取默认字体的行高
-            q_bbox = font_quote.getbbox("高")
-            q_font_h = q_bbox[3] - q_bbox[1]
-
-            # 逐行处理原始引言文本
-            lines = from_html_escaped(quote_content).split('\n')
-            raw_lines = []
-            pure_center = True
-            for line in lines:
-                match = re.match(r'^\[([:_-]+)\](.*)', line.strip())
-                if match:
-                    spec, text_content = match.groups()
-                    text_content = text_content.strip()
-                    raw_lines.append((spec, text_content))
-                    if spec != '-':
-                        pure_center &= spec == ':-:' or spec == ':_:'
-                else:
-                    raw_lines.append((None, line.strip()))
+
+            # 对齐行的循环不变量：居中起点与右边界
+            center_base_x = q_x if pure_center else q_x + q_max_w * 0.1
+            right_edge_x = q_x + q_max_w
+
+            # 逐行处理原始引言文本 (复用排版阶段的解析结果)
             for spec, text_content in raw_lines:
                 if spec:
                     if spec == '-':
@@ -689,22 +1061,21 @@ class MusicCard:
                             # 1. 准备字体 (1/3 原大小)
                             div_font_size = int(font_quote.size / 1.5)
                             div_font_size = max(8, div_font_size)  # 最小尺寸保护
-                            div_font = ImageFont.truetype(self.font_path, div_font_size, index=self.Regular)
+                            div_font = _load_font(self.font_path, div_font_size, self.Regular)
 
                             # 2. 计算文本尺寸
                             # 获取文本宽度
-                            div_text_w = draw.textlength(text_content, font=div_font)
+                            div_text_w = _text_width(div_font, text_content)
 
                             # 获取参考高度 (使用通用高字符，保证不同行的分割线高度一致)
                             # 注意：这里获取的是边界框高度，用于计算占位
-                            div_bbox = div_font.getbbox("Hg")
-                            div_text_h = div_bbox[3] - div_bbox[1]
+                            div_text_h = _line_height(div_font, "Hg")
 
                             # 3. 布局计算 (核心修改)
                             div_total_w = q_max_w * 0.5
                             center_x = q_x + q_max_w / 2
-                            area_start_x = center_x - div_total_w * 0.75
-                            area_end_x = center_x + div_total_w * 0.75
+                            area_start_x = int(center_x - div_total_w * 0.75)
+                            area_end_x = int(center_x + div_total_w * 0.75)
                             text_x = center_x - div_text_w / 2
                             text_gap = 8
 
@@ -712,15 +1083,16 @@ class MusicCard:
                             # 计算垂直中心线 Y 坐标：
                             # 当前位置 + 上方留白 + 文本高度的一半
                             div_mid_y = q_curr_y + padding_v + (div_text_h / 2)
+                            dash_y = int(div_mid_y)
                             # --- 关键修改结束 ---
 
                             # 4. 绘制流程
 
                             # 绘制左侧虚线 (在 div_mid_y 高度绘制)
-                            left_line_end = text_x - text_gap
+                            left_line_end = int(text_x - text_gap)
                             if left_line_end > area_start_x:
-                                for lx in range(int(area_start_x), int(left_line_end), 4):
-                                    draw.point((lx, div_mid_y), fill=self.C_QUOTE)
+                                bg_img.paste(self.C_QUOTE, (area_start_x, dash_y),
+                                             self._create_dash_mask(left_line_end - area_start_x))
 
                             # --- 关键修改开始 ---
                             # 绘制中间文本 (使用 anchor="lm" 实现垂直居中)
@@ -729,10 +1101,10 @@ class MusicCard:
                             # --- 关键修改结束 ---
 
                             # 绘制右侧虚线 (在 div_mid_y 高度绘制)
-                            right_line_start = text_x + div_text_w + text_gap
+                            right_line_start = int(text_x + div_text_w + text_gap)
                             if right_line_start < area_end_x:
-                                for lx in range(int(right_line_start), int(area_end_x), 4):
-                                    draw.point((lx, div_mid_y), fill=self.C_QUOTE)
+                                bg_img.paste(self.C_QUOTE, (right_line_start, dash_y),
+                                             self._create_dash_mask(area_end_x - right_line_start))
 
                             # 更新 Y 轴：加上方留空 + 文本本身高度 + 下方留空
                             q_curr_y += padding_v + div_text_h + padding_v
@@ -740,10 +1112,8 @@ class MusicCard:
                         # --- 情况 A: 行首有对齐标记 ---
                         # 1. 确定字体
                         use_small_font = '_' in spec
-                        font_size = int(font_quote.size * 0.8) if use_small_font else font_quote.size
-                        target_font = ImageFont.truetype(self.font_path, font_size, index=self.Regular) if use_small_font else font_quote
-                        target_bbox = target_font.getbbox("高")
-                        target_font_h = target_bbox[3] - target_bbox[1]
+                        target_font = font_quote_small if use_small_font else font_quote
+                        target_line_adv = small_q_line_adv if use_small_font else q_line_adv
 
                         # 2. 确定对齐方式
                         norm_spec = spec.replace('_', '-')
@@ -754,61 +1124,58 @@ class MusicCard:
                             align = "right"
 
                         # 3. 文本换行 (使用 80% 宽度)
-                        wrap_width = q_max_w * (1 if pure_center else 0.8)
-                        margin_w = q_max_w * 0.1
-                        wrapped_sub_lines, _ = self._process_text_wrapping(draw, text_content, target_font, wrap_width)
+                        wrapped_sub_lines, _ = self._wrap_text(text_content, target_font,
+                                                               spec_wrap_width)
 
                         # 4. 绘制换行后的每一行
+                        # 按测得的宽度计算左侧起点 (不用 "ma"/"ra" 锚点：其取整方式不同，会使整行偏移约 1px)
                         for sub_line in wrapped_sub_lines:
-                            sub_line_width = draw.textlength(sub_line, font=target_font)
-
                             x_pos = q_x  # 默认是 `:-` (左对齐)
                             if align == "center":  # `:-:` (居中)
-                                x_pos = (q_x + margin_w * int(not pure_center)) + (wrap_width - sub_line_width) / 2
+                                x_pos = center_base_x + (spec_wrap_width - _text_width(target_font, sub_line)) / 2
                             elif align == "right":  # `-:` (右对齐)
                                 # 对齐到整个可用区域的右侧
-                                x_pos = (q_x + q_max_w) - sub_line_width
+                                x_pos = right_edge_x - _text_width(target_font, sub_line)
 
                             draw.text((x_pos, q_curr_y), sub_line, font=target_font, fill=self.C_QUOTE)
-                            q_curr_y += target_font_h * 1.6
+                            q_curr_y += target_line_adv
 
                 else:
                     # --- 情况 B: 普通行 (默认行为) ---
                     if not text_content:  # 处理空行
-                        q_curr_y += q_font_h * 1.6
+                        q_curr_y += q_line_adv
                         continue
 
                     # 1. 文本换行 (使用 100% 宽度)
-                    wrapped_sub_lines, _ = self._process_text_wrapping(draw, text_content, font_quote, q_max_w)
+                    wrapped_sub_lines, _ = self._wrap_text(text_content, font_quote, q_max_w)
 
                     # 2. 绘制换行后的每一行
                     for sub_line in wrapped_sub_lines:
                         draw.text((q_x, q_curr_y), sub_line, font=font_quote, fill=self.C_QUOTE)
-                        q_curr_y += q_font_h * 1.6
+                        q_curr_y += q_line_adv
 
             # 装饰引号
             deco_x = self.CONTENT_RIGHT_X - 80
-            deco_y = q_curr_y - 20 if mode == self.DAILY else q_curr_y - 60
+            deco_y = q_curr_y - 20 if is_daily else q_curr_y - 60
+            deco_top = int(deco_y)
             deco_color = self.get_adaptive_deco_color(
-                bg_img.crop((int(deco_x), int(deco_y), int(deco_x + 60), int(deco_y + 60))), theme_rgb
+                bg_img.crop((deco_x, deco_top, deco_x + 60, deco_top + 60)), theme_rgb
             )
             draw.text((deco_x, deco_y), "”", font=font_deco, fill=deco_color)
 
             # 来源
-            if mode == self.DAILY:
+            if is_daily:
                 self._draw_text_right(draw, "--来自 @" + quote_source + " 的评论", font_quote_sub, self.CONTENT_RIGHT_X,
                                       q_curr_y + 20, self.C_SUB)
 
                 # 虚线分隔符 & 文字
                 bot_sep_y = mid_y + middle_h + 10
-                for x in range(self.CONTENT_LEFT_X, self.CONTENT_RIGHT_X, 20):
-                    draw.ellipse((x, bot_sep_y, x + 4, bot_sep_y + 4), fill=self.C_ACCENT)
+                bg_img.paste(self._dot_strip, (self.CONTENT_LEFT_X, int(bot_sep_y)), self._dot_strip)
 
                 foot_base_y = bot_sep_y
                 foot_y = foot_base_y + 24
                 ct = "AMLL 亲友团 | 今日推荐"
-                ct_bbox = draw.textbbox((0, 0), ct, font=font_fc)
-                draw.text((self.MARGIN_SIDE + (self.CARD_W - (ct_bbox[2] - ct_bbox[0])) / 2, foot_y),
+                draw.text((self.MARGIN_SIDE + (self.CARD_W - _text_width(font_fc, ct)) / 2, foot_y),
                           ct, font=font_fc, fill=self.C_FOOTER_CENTER)
         else:
             foot_base_y = sep_y
@@ -830,39 +1197,32 @@ class MusicCard:
 
         return bg_img
 
+    # --- 输出 ---
+
+    @staticmethod
+    def save(img: Image.Image, path: str) -> None:
+        """
+        按扩展名保存卡片图片
+        - .webp: quality=90, method=4，编码速度与体积均明显优于 PNG
+        - .png: compress_level=1，以少量体积换取更快的编码
+        """
+        ext = path.rsplit('.', 1)[-1].lower()
+        if ext == 'webp':
+            img.save(path, 'WEBP', quality=90, method=4)
+        elif ext == 'png':
+            img.save(path, 'PNG', compress_level=1)
+        else:
+            img.save(path)
+
+
 def from_html_escaped(text: str) -> str:
-    return (text
-            .replace("&lt;", "<")
-            .replace("&gt;", ">")
-            .replace("&amp;", "&")
-            .replace("&quot;", "\"")
-            .replace("&#39;", "'"))
-
-
-async def fetch_lines(music_id: str, platform: str):
-    folder = {
-        "ncm": "ncm-lyrics",
-        "qq": "qq-lyrics"
-    }
-    url = f"{TTML_DB_URL_PREFIX}/{folder[platform]}/{music_id}.ttml"
-    print(f"正在从 {url} 获取 {music_id} 的 TTML 文件...")
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    print(f"Error: {resp.status}")
-                    return None
+    return html.unescape(text)
 
-                # API 可能返回 "null" 或 JSON 对象
-                text_resp = await resp.text()
-                if not text_resp or text_resp.strip() == "null":
-                    print("该 ID 所对应歌词还无人制作")
-                    return None
 
-                return TTML(text_resp).text
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
+async def fetch_lines(music_id: str, platform: str) -> Optional[str]:
+    """[异步] 获取歌词引言文本 (兼容旧接口，临时创建不带字体的 MusicCard，只用于联网获取)"""
+    async with MusicCard(platform=platform) as card_gen:
+        return await card_gen.fetch_lines(music_id)
 
 
 # --- 逻辑控制入口 ---
@@ -877,13 +1237,28 @@ async def generate_music_card_process(
         inner_blurred: bool = False,
         show_qrcode: bool = False,
         font_path: str = "PingFang.ttc",
-        qq_music_cookie: str = ""
+        qq_music_cookie: str = "",
+        cover_cache_dir: str | Path | None = None
 ) -> Optional[Image.Image]:
     """
     逻辑控制中心：根据优先级获取数据并调用绘图
     优先级：每日推荐 API > 命令行 MUSIC ID > 命令行手动 Info
     """
-    card_gen = MusicCard(font_path, platform)
+    async with MusicCard(font_path, platform, cover_cache_dir) as card_gen:
+        return await _generate_music_card(card_gen, platform, mode, date_str, music_id_arg, info_arg, quote_arg,
+                                          inner_blurred, show_qrcode, qq_music_cookie)
+
+
+async def _generate_music_card(card_gen: MusicCard,
+                               platform: str,
+                               mode: str,
+                               date_str: str,
+                               music_id_arg: Optional[str],
+                               info_arg: Optional[list],
+                               quote_arg: Optional[list],
+                               inner_blurred: bool,
+                               show_qrcode: bool,
+                               qq_music_cookie: str) -> Optional[Image.Image]:
     final_data = {}
 
     # 初始化日期对象
@@ -896,6 +1271,18 @@ async def generate_music_card_process(
 
     final_data['date_obj'] = date_obj
     daily_data = None
+    cover_img = None
+
+    # 按平台确定歌曲信息的获取方法
+    if platform == "ncm":
+        fetch_song_info = card_gen.fetch_ncm_song_info
+    else:
+        fetch_song_info = partial(card_gen.fetch_qq_music_info, cookie=qq_music_cookie)
+
+    # 歌词模式下歌词与歌曲信息互不依赖，提前并发获取
+    lyric_task = None
+    if mode == MusicCard.LYRIC and music_id_arg:
+        lyric_task = asyncio.create_task(card_gen.fetch_lines(music_id_arg))
 
     if mode == MusicCard.DAILY:
         # 尝试获取每日推荐
@@ -906,17 +1293,23 @@ async def generate_music_card_process(
         # 从每日推荐中提取 music_id 和推荐语
         rec_music_id = daily_data.get('music_id')
         if rec_music_id:
-            # 补充歌曲信息
-            song_info = await card_gen.fetch_ncm_song_info(
-                rec_music_id) if platform == "ncm" else await card_gen.fetch_qq_music_info(rec_music_id,
-                                                                                           qq_music_cookie)
+            daily_cover_url = None
+            cover = daily_data.get('cover_path')
+            if cover and cover != "/tj/wfm.jpg":
+                if cover[0] == "/":
+                    daily_cover_url = "https://amlldb.bikonoo.com" + cover
+                else:
+                    daily_cover_url = cover
+
+            # 补充歌曲信息 (推荐自带封面时，封面与歌曲信息互不依赖，并发获取)
+            if daily_cover_url:
+                song_info, cover_img = await asyncio.gather(fetch_song_info(rec_music_id),
+                                                            card_gen.download_image(daily_cover_url))
+            else:
+                song_info = await fetch_song_info(rec_music_id)
             if song_info:
-                cover = daily_data.get('cover_path')
-                if cover and cover != "/tj/wfm.jpg":
-                    if cover[0] == "/":
-                        song_info['cover_url'] = "https://amlldb.bikonoo.com" + cover
-                    else:
-                        song_info['cover_url'] = cover
+                if daily_cover_url:
+                    song_info['cover_url'] = daily_cover_url
                 final_data.update(song_info)  # title, artist, cover_url, music_id
 
         # 覆盖引言
@@ -932,9 +1325,7 @@ async def generate_music_card_process(
             print("无每日推荐或获取失败，检查命令行参数...")
 
         if music_id_arg:
-            song_info = await card_gen.fetch_ncm_song_info(
-                music_id_arg) if platform == "ncm" else await card_gen.fetch_qq_music_info(music_id_arg,
-                                                                                           qq_music_cookie)
+            song_info = await fetch_song_info(music_id_arg)
             if song_info:
                 final_data.update(song_info)
         # 回退到手动 Info 参数
@@ -946,13 +1337,15 @@ async def generate_music_card_process(
     # 检查是否具备生成条件
     if 'title' not in final_data:
         print("错误: 无法获取歌曲信息 (Daily API 返回值为空, 且未提供有效 NCM ID 或 Info)")
+        if lyric_task:
+            lyric_task.cancel()
         return None
 
     # 处理手动引言 (仅当 API 未提供引言时，才使用命令行参数覆盖默认值)
     # 如果 Daily API 已经填入了 quote_content，则忽略命令行 quote
     if 'quote_content' not in final_data:
         if mode == MusicCard.LYRIC:
-            lines = await fetch_lines(music_id_arg, platform)
+            lines = await lyric_task if lyric_task else await card_gen.fetch_lines(music_id_arg)
             if not lines:
                 print("错误: 无法获取歌曲信息 (Daily API 返回值为空, 且未提供有效 NCM ID 或 Info)")
                 return None
@@ -966,7 +1359,7 @@ async def generate_music_card_process(
             final_data['quote_source'] = "RuriChan"
 
     # 生成图片
-    return await card_gen.generate(final_data, inner_blurred, show_qrcode, mode)
+    return await card_gen.generate(final_data, inner_blurred, show_qrcode, mode, cover_img)
 
 
 # --- 命令行入口 ---
@@ -974,7 +1367,7 @@ async def generate_music_card_process(
 async def main():
     parser = argparse.ArgumentParser(description="生成仿网易云音乐风格的音乐卡片")
     parser.add_argument("--platform", type=str, choices=["ncm", "qq"], default="ncm", help="获取歌曲的平台 ncm/qq")
-    parser.add_argument("--mode", type=str, choices=["daily", "card", "lyric"], default="daily", help="制卡模式")
+    parser.add_argument("--mode", type=str, choices=[m.value for m in CardMode], default="daily", help="制卡模式")
     parser.add_argument("--date", type=str, default=datetime.now().strftime("%Y-%m-%d"), help="日期 YYYY-MM-DD")
     parser.add_argument("--info", nargs=3, metavar=('TITLE', 'ARTIST', 'COVER_URL'), help="手动指定歌曲信息")
     parser.add_argument("--quote", nargs=2, metavar=('CONTENT', 'SOURCE'), help="引言内容与来源")
@@ -982,31 +1375,38 @@ async def main():
     parser.add_argument("--qrcode", action="store_true", help="生成二维码")
     parser.add_argument("--qq-music-cookie", type=str, help="QQ 音乐 Cookie")
     parser.add_argument("--music-id", type=str, help="歌曲 ID")
+    parser.add_argument("--format", type=str, choices=["png", "webp"], default="png", help="输出图片格式")
+    parser.add_argument("--cover-cache", type=str, nargs="?", const=str(DEFAULT_COVER_CACHE_DIR),
+                        help=f"开启封面磁盘缓存，可指定目录 (默认 {DEFAULT_COVER_CACHE_DIR})")
 
     args = parser.parse_args()
 
-    img = await generate_music_card_process(
-        platform=args.platform,
-        mode=args.mode,
-        date_str=args.date,
-        music_id_arg=args.music_id,
-        info_arg=args.info,
-        quote_arg=args.quote,
-        inner_blurred=args.inner_blurred,
-        show_qrcode=args.qrcode,
-        qq_music_cookie=args.qq_music_cookie
-    )
+    try:
+        img = await generate_music_card_process(
+            platform=args.platform,
+            mode=args.mode,
+            date_str=args.date,
+            music_id_arg=args.music_id,
+            info_arg=args.info,
+            quote_arg=args.quote,
+            inner_blurred=args.inner_blurred,
+            show_qrcode=args.qrcode,
+            qq_music_cookie=args.qq_music_cookie,
+            cover_cache_dir=args.cover_cache
+        )
+    finally:
+        await MusicCard.aclose_connector()
 
     if img:
         filename = ''
         match args.mode:
             case MusicCard.LYRIC:
-                filename = f"music_lyric_{args.music_id}.png"
+                filename = f"music_lyric_{args.music_id}.{args.format}"
             case MusicCard.CARD:
-                filename = f"music_card_{args.music_id}.png"
+                filename = f"music_card_{args.music_id}.{args.format}"
             case MusicCard.DAILY:
-                filename = f"music_card_{args.date}.png"
-        img.save(filename)
+                filename = f"music_card_{args.date}.{args.format}"
+        MusicCard.save(img, filename)
         print(f"图片保存成功: {filename}")
         # img.show()
 
@@ -0,0 +1,29 @@
+import unittest
+
+import numpy as np
+
+from music_card_gen import MusicCard
+
+
+class RoundedMaskTest(unittest.TestCase):
+    # 覆盖四角模板拼接 (大尺寸) 与整张直接绘制 (小尺寸) 两条路径
+    CASES = [((920, 1500), 40), ((600, 600), 30), ((60, 50), 20), ((100, 100), 40)]
+
+    def test_corners_mirror_symmetric(self):
+        for size, radius in self.CASES:
+            with self.subTest(size=size, radius=radius):
+                mask = np.asarray(MusicCard.create_rounded_mask(size, radius))
+                self.assertEqual(mask.shape, (size[1], size[0]))
+                np.testing.assert_array_equal(mask, mask[:, ::-1])
+                np.testing.assert_array_equal(mask, mask[::-1, :])
+
+    def test_center_opaque_and_corner_transparent(self):
+        for size, radius in self.CASES:
+            with self.subTest(size=size, radius=radius):
+                mask = MusicCard.create_rounded_mask(size, radius)
+                self.assertEqual(mask.getpixel((size[0] // 2, size[1] // 2)), 255)
+                self.assertEqual(mask.getpixel((0, 0)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,51 @@
-from lxml.etree import _Element, fromstring, XMLSyntaxError
+from functools import lru_cache
+from itertools import islice
+from sys import intern
+
+from lxml.etree import _Element, fromstring, XMLParser, XMLSyntaxError, XPath
 
 from ttml.ttml_error import TTMLError
 from ttml.ttml_line import TTMLLine
 from ttml.utils import qname, NS_MAP
 
+# 预编译的 XPath (模块加载时编译一次，解析每个文档时直接复用)
+_XP_BODY = XPath(".//tt:body", namespaces=NS_MAP)
+
+# 遍历时使用的标签全名；iTunesMetadata 下的翻译可能带或不带 itunes 前缀，用 {*} 匹配任意命名空间
+_TAG_DIV = qname('tt', 'div')
+_TAG_P = qname('tt', 'p')
+_TAG_TRANSLATION = "{*}translation"
+_TAG_TEXT = "{*}text"
+
+# 属性全名同样只在模块加载时拼接一次；song-part 的两种写法按顺序回退
+_ATTR_LANG = qname('xml', 'lang')
+_ATTR_SONG_PART = (qname('itunes', 'song-part'), qname('itunes', 'songPart'))
+_ATTR_FOR = qname('itunes', 'for')
+
 
 class Part:
+    __slots__ = ('count', 'name')
+
     def __init__(self, count: int, name: str):
         self.count: int = count
         self.name: str = name
 
 
 class TTML:
-    def __init__(self, xml_content: str):
+    __slots__ = ('_have_duet', '_lines', '_parts', '_lang')
+
+    def __init__(self, xml_content: str | bytes):
         try:
             # 1. 解析 XML 字符串
             # lxml 最佳实践：使用 .encode('utf-8') 将 python str 转为 bytes
             # 这样 lxml 可以正确处理 xml 头部声明的 encoding (如 <?xml ... encoding="gbk"?>)
-            tt: _Element | None = fromstring(xml_content.encode('utf-8'))
+            # 已是 bytes (如网络响应原文) 时直接交给 lxml，省去一次解码再编码
+            if isinstance(xml_content, str):
+                xml_content = xml_content.encode('utf-8')
+            # TTML 不会按 xml:id 查找元素，不必建立 ID 表
+            # 注意不能开启 remove_blank_text：逐字歌词中 span 之间的空格 ("</span> <span>") 就是词间空格
+            # 解析器实例不能跨线程共享 (解析可能在 to_thread 的工作线程中进行)，每次新建，开销远小于解析本身
+            tt: _Element | None = fromstring(xml_content, XMLParser(collect_ids=False))
         except (XMLSyntaxError, ValueError):
             # 2. 如果解析失败，抛出错误
             TTMLError.throw_xml_error()
@@ -28,7 +56,7 @@ class TTML:
         self._parts: list[Part] = []
 
         # 获取 xml:lang
-        self._lang = tt.get(qname('xml', 'lang'))
+        self._lang = tt.get(_ATTR_LANG)
         if not self._lang:
             self._lang = "zh-Hans"
 
@@ -37,27 +65,28 @@ class TTML:
         # 所以在 xpath 中必须使用我们定义的前缀 'tt' 来查找标准标签
 
         # 查找 tt -> body (通常 body 是 tt 的直接子元素，用 / 或 .// 均可，这里用 .// 更稳健)
-        body_list = tt.xpath(".//tt:body", namespaces=NS_MAP)
+        body_list = _XP_BODY(tt)
         # head_list = tt.xpath(".//tt:head", namespaces=NS_MAP) # 虽然原逻辑获取了但未实际使用
 
         if body_list:
-            # 查找 body -> div
-            divs: list[_Element] = tt.xpath(".//*[local-name()='div']")
-
             # 使用 update 方法来更新集合 (原代码 union 不会修改原集合)
             langs: set[str] = set()
+            translations: list[_Element] = []
 
+            # 单次遍历整棵树：lxml 在 C 层按标签过滤，只有 div / p / translation 会回到 Python
+            # 按文档顺序，p 总是出现在其所属 div 之后，直接计入最近的 Part
+            # translation 位于 head 中 (早于 body)，先收集，等所有行建立后再挂载
             index: int = 0
-            for div in divs:
-                # 获取 itunes:song-part 属性
-                part_name = div.get(qname('itunes', 'song-part')) or div.get(qname('itunes', 'songPart'))
-                self._parts.append(Part(0, part_name or ""))
-
-                # 查找 div -> p
-                p_elements: list[_Element] = div.xpath(".//*[local-name()='p']")
-
-                for p in p_elements:
-                    line: TTMLLine = TTMLLine(p, self._lang)
+            for el in tt.iter(_TAG_DIV, _TAG_P, _TAG_TRANSLATION):
+                tag = el.tag
+                if tag == _TAG_DIV:
+                    # 获取 itunes:song-part 属性
+                    part_name = el.get(_ATTR_SONG_PART[0]) or el.get(_ATTR_SONG_PART[1])
+                    self._parts.append(Part(0, part_name or ""))
+                elif tag == _TAG_P:
+                    if not self._parts:
+                        continue
+                    line: TTMLLine = TTMLLine(el, self._lang)
                     # 处理 key 为 None 的情况
                     if not line.key:
                         line.key = f"L{index + 1}"
@@ -67,29 +96,37 @@ class TTML:
                     self._parts[-1].count += 1
                     langs.update(line.ts_langs)
                     index += 1
+                else:
+                    translations.append(el)
+
+            # 1. 先从各 translation 标签获取语言，提前确定最终使用的翻译语言
+            # 语言标签驻留后，与行内翻译的语言比较、查找时可直接比较指针
+            ts_langs: list[str] = [intern(translation.get(_ATTR_LANG) or "zh-Hans") for translation in translations]
+            langs.update(ts_langs)
+            lang: str = select_translation_key(langs)
 
-            # 获取 translation 标签
-            translations: list[_Element] = tt.xpath(".//*[local-name()='translation']")
+            # 只挂载选中语言的翻译，其余语言最终都会被丢弃，不必逐行拆分括号再存入
+            selected: list[_Element] = [
+                translation for translation, ts_lang in zip(translations, ts_langs) if ts_lang == lang
+            ]
 
             # 【优化】构建 key 到 line 的映射字典，避免在循环中重复遍历 list
-            # 这样查找复杂度从 O(N*M) 降低到 O(1)
-            line_map = {line.key: line for line in self._lines}
-
-            for translation in translations:
-                # 1. 从 translation 标签获取语言
-                lang: str = translation.get(qname('xml', 'lang'))
-                if not lang:
-                    lang = "zh-Hans"
-                langs.add(lang)
+            # 这样查找复杂度从 O(N*M) 降低到 O(1)；没有可挂载的翻译时 (纯原文歌词很常见) 不必建立
+            line_map = {line.key: line for line in self._lines} if selected else {}
 
+            for translation in selected:
                 # 2. 遍历 translation 下的 text 子节点
                 # 由于 iTunesMetadata 声明了默认命名空间，这里的 text 实际上是 itunes:text
-                # 使用 local-name()='text' 可以稳健地获取到，无论它是否有前缀
-                text_nodes: list[_Element] = translation.xpath("./*[local-name()='text']")
+                # 使用 {*}text 可以稳健地获取到，无论它是否有前缀
+                text_nodes = translation.iterchildren(_TAG_TEXT)
 
                 for text_node in text_nodes:
                     # 3. 获取 innerText (歌词翻译内容)
-                    text_content = "".join(text_node.itertext())
+                    # 绝大多数翻译是纯文本叶子节点，直接取 .text；含子元素时才拼接整个子树
+                    if len(text_node):
+                        text_content = "".join(text_node.itertext())
+                    else:
+                        text_content = text_node.text or ""
 
                     # 4. 获取 for 属性 (目标行的 key)
                     # 属性通常不继承默认命名空间，所以直接用 "for"
@@ -97,13 +134,13 @@ class TTML:
 
                     # 以防万一，如果属性也带了命名空间
                     if not target_key:
-                        target_key = text_node.get(qname('itunes', 'for'))
+                        target_key = text_node.get(_ATTR_FOR)
 
                     # 5. 查找对应的行并调用 append_ts
                     if target_key and target_key in line_map:
                         line_map[target_key].append_ts(text_content, lang)
 
-            lang: str = select_translation_key(langs)
+            # 行内 (x-translation) 翻译在建行时按语言存入，统一只保留选中的语言
             for line in self._lines:
                 line.filter_ts(lang)
         else:
@@ -112,14 +149,11 @@ class TTML:
     @property
     def text(self) -> str:
         text: list[str] = []
-        index = 0
+        # 各 Part 依次消费行迭代器中的 count 行
+        lines = iter(self._lines)
         for part in self._parts:
-            count = part.count
             text.append(f"[-]{part.name}")
-            while count > 0:
-                text.append(self._lines[index].to_text(self._have_duet))
-                count -= 1
-                index += 1
+            text.extend(line.to_text(self._have_duet) for line in islice(lines, part.count))
 
         return '\n'.join(text)
 
@@ -127,6 +161,12 @@ class TTML:
 def select_translation_key(keys: set[str]) -> str | None:
     if not keys:
         return None
+    # 同一批歌词的语言组合高度重复，按不可变集合缓存选择结果
+    return _select_translation_key(frozenset(keys))
+
+
+@lru_cache(maxsize=256)
+def _select_translation_key(keys: frozenset[str]) -> str:
     if 'zh-Hans' in keys:
         return 'zh-Hans'
     if 'zh-CN' in keys:
@@ -1,20 +1,34 @@
+from collections.abc import KeysView
 from re import Pattern, compile
+from sys import intern
 
 from lxml.etree import _Element
 
 from ttml.utils import qname  # 假设 NS_MAP 和 qname 定义在 ttml.py 或 common
 
+# 属性全名 (模块加载时生成一次，避免每行、每个子元素重复拼接字符串)
+_ATTR_KEY = qname('itunes', 'key')
+_ATTR_AGENT = qname('ttm', 'agent')
+_ATTR_ROLE = qname('ttm', 'role')
+_ATTR_LANG = qname('xml', 'lang')
+
+# ttm:role 的取值
+_ROLE_BG = "x-bg"
+_ROLE_TS = "x-translation"
+
 
 class TTMLLine:
+    # 每个 <p> (及其背景行) 都会创建一个实例，使用 __slots__ 省去逐实例的 __dict__
+    __slots__ = ('_key', '_is_duet', '_orig_line', '_bg_line', '_ts_line', '_is_bg')
+
     brackets: Pattern[str] = compile(r'[(（]+(.+?)[）)]+')
 
     def __init__(self, element: _Element, object_lang: str, parent: "TTMLLine" = None):
         # 使用精确的命名空间获取属性
         # 对应 itunes:key
-        self._key: str = element.get(qname('itunes', 'key'))
+        self._key: str = element.get(_ATTR_KEY)
 
         self._is_duet: bool = False
-        self._orig_line: str = ""
 
         self._bg_line: TTMLLine | None = None
         self._ts_line: dict[str, str] | str | None = dict[str, str]()
@@ -22,40 +36,43 @@ class TTMLLine:
         self._is_bg: bool = parent is not None
 
         # 对应 ttm:agent
-        agent: str = element.get(qname('ttm', 'agent'))
+        agent: str = element.get(_ATTR_AGENT)
         self._is_duet = bool(agent and agent != 'v1') if parent is None else parent._is_duet
 
+        # 原文片段先收集到列表，最后一次性拼接 (避免逐段 += 反复分配新字符串)
+        orig_parts: list[str] = []
+
         # 1. 获取自身的 text (对应 minidom 第一个子节点前的文本)
         if element.text:
-            self._orig_line += element.text
+            orig_parts.append(element.text)
 
         # 2. 遍历子元素
         for child in element:
             # 对应 ttm:role
-            role: str = child.get(qname('ttm', 'role'))
-
-            match role:
-                case "x-bg":
-                    self._bg_line = TTMLLine(child, object_lang, self)
-                case "x-translation":
-                    # 对应 xml:lang
-                    lang: str = child.get(qname('xml', 'lang'))
-                    if not lang:
-                        lang = "zh-Hans"
-                    self._ts_line[lang] = child.text if child.text else ""
-                case None:
-                    if child.text:
-                        self._orig_line += child.text
-                case _:
-                    pass
+            role: str = child.get(_ATTR_ROLE)
+
+            # 绝大多数子元素是不带 role 的逐字 span，放在第一个分支判断
+            if role is None:
+                if child.text:
+                    orig_parts.append(child.text)
+            elif role == _ROLE_BG:
+                self._bg_line = TTMLLine(child, object_lang, self)
+            elif role == _ROLE_TS:
+                # 对应 xml:lang
+                # 语言标签在整首歌中反复出现，驻留后字典 / 集合查找可直接比较指针
+                lang: str = intern(child.get(_ATTR_LANG) or "zh-Hans")
+                self._ts_line[lang] = child.text if child.text else ""
 
             # 3. 获取子元素后的 tail (对应 minidom 子节点后的文本)
             if child.tail:
-                self._orig_line += child.tail
+                orig_parts.append(child.tail)
+
+        self._orig_line: str = "".join(orig_parts)
 
         if self._is_bg:
-            if TTMLLine.brackets.match(self._orig_line.strip()):
-                self._orig_line = TTMLLine.brackets.match(self._orig_line.strip()).group(1).strip()
+            match = TTMLLine.brackets.match(self._orig_line.strip())
+            if match:
+                self._orig_line = match.group(1).strip()
 
     def to_text(self, have_duet: bool) -> str:
         text: list[str] = []
@@ -79,13 +96,10 @@ class TTMLLine:
         如果有背景行 (bg_line) 且文本中包含括号，
         则将括号内的内容拆分给 bg_line，括号外的保留给自己。
         """
-        # 定义提取用的正则 (兼容中文括号，非贪婪匹配内部内容)
-        # 注意：这里我们定义一个适合“提取”的正则，
-        # 原 TTML.brackets 是贪婪匹配整个字符串用于去壳，不适合从混合字符串中提取。
-        pattern = compile(r'[(（]+(.+?)[）)]+')
-
+        # 提取用的正则与类属性 brackets 相同 (兼容中文括号，非贪婪匹配内部内容)，
+        # 去壳时用 match 锚定开头，这里用 search 从混合字符串中提取，直接复用预编译的 Pattern
         # 搜索文本中是否有匹配的括号内容
-        match = pattern.search(text)
+        match = TTMLLine.brackets.search(text)
 
         if match and self._bg_line:
             # 1. 提取括号内的内容 (group 1)
@@ -125,5 +139,6 @@ class TTMLLine:
         return self._is_duet
 
     @property
-    def ts_langs(self) -> list[str]:
-        return list(self._ts_line.keys())
+    def ts_langs(self) -> KeysView[str]:
+        """行内翻译的语言 (字典视图，仅在 filter_ts 之前有效)"""
+        return self._ts_line.keys()